@@ -1,23 +1,445 @@
+import os
+import atexit
+import hashlib
 import random
-from collections import defaultdict
+import multiprocessing
+from collections import OrderedDict, defaultdict
+from functools import partial, wraps
+import numpy as np
 from deap import base, creator, tools, algorithms
 
-random.seed(42)
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+try:
+    from numba import cuda
+    HAS_CUDA = cuda.is_available()
+except ImportError:
+    HAS_CUDA = False
+
+SEED = 42
 INDPB = 0.08
+# Genomes are (2, n_lessons) arrays: row 0 holds room indices, row 1 timeslot indices
+GENE_DTYPE = np.int16
+# Batches with at least this many genes (genomes x lessons) are scored on the GPU
+CUDA_MIN_GENES = 500_000
+CUDA_THREADS = 128
+
+# Teacher availability columns, indexed by the first letter of the shift name
+# (Manhã/Tarde/Noite or Morning/Afternoon/Evening)
+SHIFT_COLUMNS = {"M": 0, "T": 1, "A": 1, "N": 2, "E": 2}
+AVAILABILITY_KEYS = ("available_morning", "available_afternoon", "available_evening")
 
 # ===========================================================
 # STEP 1: CREATE INDIVIDUALS
 # ===========================================================
-def create_individual(rooms, timeslots, length):
-    """Create an individual composed of (room, timeslot) pairs."""
-    return [(random.choice(rooms), random.choice(timeslots)) for _ in range(length)]
+def sample_rooms(tables, lessons, rng, constrained=True):
+    """
+    Draw a room index for each lesson index in `lessons`.
+
+    When `constrained`, each lesson gets a known room big enough for its class
+    (or any room if none is); otherwise rooms are drawn uniformly.
+    """
+    n_rooms = tables["n_rooms"]
+    rooms_by_capacity = tables["rooms_by_capacity"]
+    if not constrained or rooms_by_capacity.size == 0:
+        return rng.integers(0, n_rooms, size=len(lessons))
+
+    start = tables["feasible_start"][lessons]
+    n_fit = rooms_by_capacity.size - start
+    draw = rng.random(len(lessons))
+    pos = np.minimum(start + (draw * n_fit).astype(np.int64), rooms_by_capacity.size - 1)
+    return np.where(n_fit > 0, rooms_by_capacity[pos], (draw * n_rooms).astype(np.int64))
+
+
+def create_individual(tables, rng, constrained=True):
+    """Create an individual as a (2, n_lessons) array of room and timeslot indices."""
+    length = len(tables["students"])
+    genes = np.empty((2, length), dtype=GENE_DTYPE)
+    genes[0] = sample_rooms(tables, np.arange(length), rng, constrained)
+    genes[1] = rng.integers(0, tables["n_timeslots"], size=length)
+    return genes
 
 
 # ===========================================================
 # STEP 2: FITNESS EVALUATION
 # ===========================================================
-def evaluate_schedule(individual, lesson_instances, rooms_capacity, class_students,
-                      teacher_of_lesson, teacher_info, class_grade_map):
+def precompute_lesson_tables(rooms, timeslots, lesson_instances, rooms_capacity, class_students,
+                             teacher_of_lesson, teacher_info, schedule_meta=None):
+    """
+    Encode the static problem data as NumPy arrays, once per run.
+
+    Genes hold indices into `rooms` and `timeslots`; teachers are mapped to
+    integer ids in order of first appearance (-1 means no teacher), so the
+    fitness function only needs array indexing. The shift of each timeslot
+    is read from `schedule_meta`; timeslots with an unknown shift (or no
+    metadata at all) skip the availability check.
+    """
+    length = len(lesson_instances)
+
+    room_known = np.array([room in rooms_capacity for room in rooms], dtype=bool)
+    room_capacity = np.array([rooms_capacity.get(room, 0) for room in rooms], dtype=np.int64)
+    # Lesson ids are "class::subject::n"; split them once for the whole run
+    lesson_parts = [lesson.split("::") for lesson in lesson_instances]
+    class_ids = [parts[0] for parts in lesson_parts]
+    subjects = [parts[1] for parts in lesson_parts]
+    students = np.array([class_students[class_id] for class_id in class_ids], dtype=np.int64)
+
+    teacher_ids = []
+    teacher_index = {}
+    teacher = np.full(length, -1, dtype=np.int32)
+    for idx in range(length):
+        teacher_id = teacher_of_lesson.get(idx, None)
+        if teacher_id:
+            if teacher_id not in teacher_index:
+                teacher_index[teacher_id] = len(teacher_ids)
+                teacher_ids.append(teacher_id)
+            teacher[idx] = teacher_index[teacher_id]
+
+    # A teacher without a workload limit can never exceed the total number of lessons.
+    # Limits stay floats, so a fractional one is compared as given
+    max_load = np.full(len(teacher_ids), length, dtype=np.float64)
+    pref_ok = np.ones((len(teacher_ids), len(timeslots)), dtype=bool)
+    fav_miss = np.zeros(length, dtype=bool)
+    avail = np.ones((len(teacher_ids), len(AVAILABILITY_KEYS)), dtype=bool)
+    teacher_names = []
+    preferred_periods_by_teacher = []
+    fav_subjects_by_teacher = []
+    for t, teacher_id in enumerate(teacher_ids):
+        tinfo = teacher_info.get(teacher_id, {})
+        teacher_names.append(tinfo.get("teacher_name", teacher_id))
+        avail[t] = [bool(tinfo.get(key, True)) for key in AVAILABILITY_KEYS]
+        maxw = tinfo.get("teacher_max_workload", None)
+        if maxw is not None:
+            max_load[t] = float(maxw)
+
+        preferred_periods_str = tinfo.get("teacher_preferred_periods", "")
+        preferred_periods = [p.strip() for p in preferred_periods_str.split(",") if p.strip()]
+        preferred_periods_by_teacher.append(preferred_periods)
+        if preferred_periods:
+            preferred_set = set(preferred_periods)
+            pref_ok[t] = [timeslot in preferred_set for timeslot in timeslots]
+
+        fav_subjects_str = tinfo.get("teacher_favorites_subject", "")
+        fav_subjects = [s.strip() for s in fav_subjects_str.split(",") if s.strip()]
+        fav_subjects_by_teacher.append(fav_subjects)
+        if fav_subjects:
+            fav_set = set(fav_subjects)
+            for idx in np.flatnonzero(teacher == t):
+                fav_miss[idx] = subjects[idx] not in fav_set
+
+    # Known rooms by ascending capacity; lesson i fits rooms_by_capacity[feasible_start[i]:]
+    known_rooms = np.flatnonzero(room_known)
+    rooms_by_capacity = known_rooms[np.argsort(room_capacity[known_rooms], kind="stable")]
+    feasible_start = np.searchsorted(room_capacity[rooms_by_capacity], students, side="left")
+
+    schedule_meta = schedule_meta or {}
+    shift_of_ts = np.full(len(timeslots), -1, dtype=np.int8)
+    for j, timeslot in enumerate(timeslots):
+        shift = str(schedule_meta.get(timeslot, {}).get("shift", "") or "")
+        shift_of_ts[j] = SHIFT_COLUMNS.get(shift[:1].upper(), -1)
+    # Teacher x timeslot lookup, so the fitness needs no per-gene shift branches
+    unavailable = np.zeros((len(teacher_ids), len(timeslots)), dtype=bool)
+    known_shift = shift_of_ts >= 0
+    unavailable[:, known_shift] = ~avail[:, shift_of_ts[known_shift]]
+
+    return {
+        "rooms": rooms,
+        "timeslots": timeslots,
+        "class_ids": class_ids,
+        "subjects": subjects,
+        "rooms_capacity": rooms_capacity,
+        "class_students": class_students,
+        "teacher_ids": teacher_ids,
+        "teacher_names": teacher_names,
+        "preferred_periods": preferred_periods_by_teacher,
+        "fav_subjects": fav_subjects_by_teacher,
+        "n_rooms": len(rooms),
+        "n_timeslots": len(timeslots),
+        "n_teachers": len(teacher_ids),
+        "room_known": room_known,
+        "room_capacity": room_capacity,
+        "rooms_by_capacity": rooms_by_capacity,
+        "feasible_start": feasible_start,
+        "students": students,
+        "teacher": teacher,
+        "max_load": max_load,
+        "pref_ok": pref_ok,
+        "fav_miss": fav_miss,
+        "unavailable": unavailable,
+    }
+
+
+if HAS_NUMBA:
+    @njit(cache=True)
+    def _eval_core(room_idx, ts_idx, students, room_known, room_capacity, teacher, max_load,
+                   pref_ok, fav_miss, unavailable, room_used, teacher_busy, teacher_load,
+                   upper_bound):
+        """
+        Compiled single-pass version of the checks in evaluate_schedule.
+
+        The slot and load arrays are scratch space owned by the caller and are reset here.
+        Once the hard penalty alone exceeds `upper_bound` the scan stops and that
+        partial penalty is returned; it is still a lower bound of the fitness.
+        """
+        n_ts = pref_ok.shape[1]
+        n_teachers = max_load.shape[0]
+        room_used.fill(False)
+        teacher_busy.fill(False)
+        teacher_load.fill(0)
+        hard = 0
+        soft = 0
+
+        for i in range(room_idx.shape[0]):
+            if hard > upper_bound:
+                return float(hard)
+            room = room_idx[i]
+            ts = ts_idx[i]
+            if not room_known[room]:
+                hard += 10
+                continue
+
+            over = students[i] - room_capacity[room]
+            if over > 0:
+                hard += 2 * over
+
+            # Every lesson after the first in the same slot adds one conflict,
+            # so a flag per slot is enough
+            key = room * n_ts + ts
+            if room_used[key]:
+                hard += 10
+            room_used[key] = True
+
+            t = teacher[i]
+            if t >= 0:
+                key = t * n_ts + ts
+                if teacher_busy[key]:
+                    hard += 10
+                teacher_busy[key] = True
+                teacher_load[t] += 1
+                if unavailable[t, ts]:
+                    hard += 10
+                if not pref_ok[t, ts]:
+                    soft += 1
+                if fav_miss[i]:
+                    soft += 1
+
+        for t in range(n_teachers):
+            if teacher_load[t] > max_load[t]:
+                hard += 2 * (teacher_load[t] - max_load[t])
+
+        return hard + 0.5 * soft
+
+    @njit(cache=True)
+    def _eval_batch(genomes, students, room_known, room_capacity, teacher, max_load,
+                    pref_ok, fav_miss, unavailable, n_rooms, n_ts, upper_bound):
+        """Run `_eval_core` over every genome of a (n, 2, n_lessons) stack."""
+        n_teachers = max_load.shape[0]
+        # Scratch arrays are allocated once per batch and reused for every genome
+        room_used = np.empty(n_rooms * n_ts, dtype=np.bool_)
+        teacher_busy = np.empty(n_teachers * n_ts, dtype=np.bool_)
+        teacher_load = np.empty(n_teachers, dtype=np.int32)
+        out = np.empty(genomes.shape[0])
+        for k in range(genomes.shape[0]):
+            out[k] = _eval_core(genomes[k, 0], genomes[k, 1], students, room_known,
+                                room_capacity, teacher, max_load, pref_ok, fav_miss,
+                                unavailable, room_used, teacher_busy, teacher_load,
+                                upper_bound)
+        return out
+
+
+if HAS_CUDA:
+    @cuda.jit
+    def _eval_kernel(genomes, students, room_known, room_capacity, teacher, max_load, pref_ok,
+                     fav_miss, unavailable, room_counts, teacher_counts, teacher_load, out):
+        """One block per genome; its threads share the genes and add their penalties to out."""
+        b = cuda.blockIdx.x
+        n_ts = pref_ok.shape[1]
+        # Clear this genome's counters on the device, so the buffers are reused between calls
+        for k in range(cuda.threadIdx.x, room_counts.shape[1], cuda.blockDim.x):
+            room_counts[b, k] = 0
+        for k in range(cuda.threadIdx.x, teacher_counts.shape[1], cuda.blockDim.x):
+            teacher_counts[b, k] = 0
+        for k in range(cuda.threadIdx.x, teacher_load.shape[1], cuda.blockDim.x):
+            teacher_load[b, k] = 0
+        if cuda.threadIdx.x == 0:
+            out[b] = 0.0
+        cuda.syncthreads()
+
+        penalty = 0.0
+        for i in range(cuda.threadIdx.x, genomes.shape[2], cuda.blockDim.x):
+            room = genomes[b, 0, i]
+            ts = genomes[b, 1, i]
+            if not room_known[room]:
+                penalty += 10
+                continue
+
+            over = students[i] - room_capacity[room]
+            if over > 0:
+                penalty += 2 * over
+
+            # The atomic returns the previous count, so every lesson after
+            # the first in a slot adds one conflict
+            if cuda.atomic.add(room_counts, (b, room * n_ts + ts), 1) > 0:
+                penalty += 10
+
+            t = teacher[i]
+            if t >= 0:
+                if cuda.atomic.add(teacher_counts, (b, t * n_ts + ts), 1) > 0:
+                    penalty += 10
+                cuda.atomic.add(teacher_load, (b, t), 1)
+                if unavailable[t, ts]:
+                    penalty += 10
+                if not pref_ok[t, ts]:
+                    penalty += 0.5
+                if fav_miss[i]:
+                    penalty += 0.5
+
+        cuda.syncthreads()
+        for t in range(cuda.threadIdx.x, max_load.shape[0], cuda.blockDim.x):
+            excess = teacher_load[b, t] - max_load[t]
+            if excess > 0:
+                penalty += 2 * excess
+        cuda.atomic.add(out, b, penalty)
+
+    # Static tables read by _eval_kernel, in argument order
+    _CUDA_TABLES = ("students", "room_known", "room_capacity", "teacher", "max_load",
+                    "pref_ok", "fav_miss", "unavailable")
+    # Device copies for the tables of the current run, plus the counter buffers
+    _CUDA_CACHE = {"tables": None, "device": None}
+
+    def _cuda_buffers(tables, n):
+        """Return the run's device arrays, uploading the tables only when they change."""
+        if _CUDA_CACHE["tables"] is not tables:
+            _CUDA_CACHE["tables"] = tables
+            _CUDA_CACHE["device"] = {
+                name: cuda.to_device(np.ascontiguousarray(tables[name])) for name in _CUDA_TABLES
+            }
+        device = _CUDA_CACHE["device"]
+        if device.get("rows", 0) < n:
+            # Per-genome slot and load counters; max(..., 1) keeps the arrays non-empty.
+            # They are only allocated here; the kernel zeroes the rows it uses
+            n_ts = tables["n_timeslots"]
+            n_teachers = tables["n_teachers"]
+            device["room_counts"] = cuda.device_array((n, tables["n_rooms"] * n_ts), dtype=np.int32)
+            device["teacher_counts"] = cuda.device_array((n, max(n_teachers * n_ts, 1)), dtype=np.int32)
+            device["teacher_load"] = cuda.device_array((n, max(n_teachers, 1)), dtype=np.int32)
+            device["out"] = cuda.device_array(n, dtype=np.float64)
+            device["rows"] = n
+        return device
+
+    def _batch_evaluate_cuda(genomes, tables):
+        """Score a (n, 2, n_lessons) stack with _eval_kernel on the GPU."""
+        n = genomes.shape[0]
+        device = _cuda_buffers(tables, n)
+        _eval_kernel[n, CUDA_THREADS](
+            cuda.to_device(np.ascontiguousarray(genomes)),
+            *(device[name] for name in _CUDA_TABLES),
+            device["room_counts"], device["teacher_counts"], device["teacher_load"], device["out"]
+        )
+        return device["out"][:n].copy_to_host()
+
+
+def check_cuda_agreement(tables, genomes=None, n_genomes=64, seed=SEED):
+    """
+    Check that the GPU kernel scores genomes exactly like the CPU path.
+
+    Uses `genomes` if given, otherwise `n_genomes` uniformly random ones
+    (which also hit unknown rooms and conflicts). Returns True when every
+    fitness matches; without a usable GPU there is nothing to compare and
+    it returns False.
+    """
+    if not HAS_CUDA:
+        return False
+    if genomes is None:
+        rng = np.random.default_rng(seed)
+        length = len(tables["students"])
+        genomes = np.stack([
+            rng.integers(0, tables["n_rooms"], size=(n_genomes, length)),
+            rng.integers(0, tables["n_timeslots"], size=(n_genomes, length)),
+        ], axis=1).astype(GENE_DTYPE)
+    genomes = np.asarray(genomes)
+    return bool(np.array_equal(_batch_evaluate_cuda(genomes, tables),
+                               batch_evaluate(genomes, tables, use_cuda=False)))
+
+
+def _slot_excess(keys, valid, n_buckets):
+    """
+    Count, per row of `keys`, how many entries repeat a bucket already used.
+
+    Rows are shifted into disjoint ranges so one bincount serves the whole
+    batch; entries where `valid` is False go to a trailing dummy bucket.
+    """
+    n = keys.shape[0]
+    offset = np.arange(n)[:, np.newaxis] * n_buckets
+    flat = np.where(valid, keys + offset, n * n_buckets).ravel()
+    counts = np.bincount(flat, minlength=n * n_buckets + 1)[:-1].reshape(n, n_buckets)
+    return np.maximum(counts - 1, 0).sum(axis=1)
+
+
+def batch_evaluate(genomes, tables, upper_bound=np.inf, use_cuda=True):
+    """
+    Evaluate a stack of genomes with shape (n, 2, n_lessons) in one call.
+
+    Returns an array with the fitness of each genome, using the same weights
+    as evaluate_schedule. With a finite `upper_bound` the compiled kernel may
+    stop scanning a genome that is already worse than it and report a partial
+    value above the bound; the NumPy fallback always computes the full value.
+    Large batches (CUDA_MIN_GENES) go to the GPU when one is available and
+    `use_cuda` is set, which also ignores the bound.
+    """
+    genomes = np.asarray(genomes)
+    n_rooms = tables["n_rooms"]
+    n_ts = tables["n_timeslots"]
+    if use_cuda and HAS_CUDA and genomes.shape[0] * genomes.shape[2] >= CUDA_MIN_GENES:
+        return _batch_evaluate_cuda(genomes, tables)
+    if HAS_NUMBA:
+        return _eval_batch(genomes, tables["students"], tables["room_known"],
+                           tables["room_capacity"], tables["teacher"], tables["max_load"],
+                           tables["pref_ok"], tables["fav_miss"], tables["unavailable"],
+                           n_rooms, n_ts, float(upper_bound))
+
+    # Widen the indices so the slot keys below cannot overflow GENE_DTYPE
+    room_idx = genomes[:, 0].astype(np.intp)
+    ts_idx = genomes[:, 1].astype(np.intp)
+
+    # HARD: Room existence and capacity
+    placed = tables["room_known"][room_idx]
+    violations = 10.0 * (~placed).sum(axis=1)
+    overflow = np.where(placed, tables["students"] - tables["room_capacity"][room_idx], 0)
+    violations += 2 * np.maximum(overflow, 0).sum(axis=1)
+
+    # HARD: Room conflicts
+    violations += 10 * _slot_excess(room_idx * n_ts + ts_idx, placed, n_rooms * n_ts)
+
+    n_teachers = tables["n_teachers"]
+    if n_teachers == 0:
+        return violations
+
+    taught = placed & (tables["teacher"] >= 0)
+    teacher = np.where(taught, tables["teacher"], 0)
+
+    # HARD: Teacher conflicts and workload
+    violations += 10 * _slot_excess(teacher * n_ts + ts_idx, taught, n_teachers * n_ts)
+    teacher_load = np.zeros((len(genomes), n_teachers), dtype=np.int64)
+    rows = np.broadcast_to(np.arange(len(genomes))[:, np.newaxis], taught.shape)
+    np.add.at(teacher_load, (rows[taught], teacher[taught]), 1)
+    violations += 2 * np.maximum(teacher_load - tables["max_load"], 0).sum(axis=1)
+
+    # HARD: Teacher availability for the timeslot's shift
+    unavailable = taught & tables["unavailable"][teacher, ts_idx]
+    violations += 10 * unavailable.sum(axis=1)
+
+    # SOFT: Preferred periods and favorite subjects
+    soft = (taught & ~tables["pref_ok"][teacher, ts_idx]).sum(axis=1)
+    soft += (taught & tables["fav_miss"]).sum(axis=1)
+    return violations + 0.5 * soft
+
+
+def evaluate_schedule(individual, tables):
     """
     Evaluate a scheduling solution considering hard and soft constraints.
 
@@ -26,174 +448,525 @@ def evaluate_schedule(individual, lesson_instances, rooms_capacity, class_studen
       - Room conflict (same room/time)
       - Teacher conflict (same teacher/time)
       - Workload limit
+      - Teacher available in the timeslot's shift
 
     SOFT CONSTRAINTS:
       - Teacher preferred periods
       - Teacher favorite subjects
+
+    The checks run in batch_evaluate as a batch of one; explain_schedule
+    describes the violations of a solution in words.
     """
-    violations = 0
-    reasons = []
+    genes = np.asarray(individual)
+    return (float(batch_evaluate(genes[np.newaxis], tables)[0]),)
+
+
+def explain_schedule(individual, tables):
+    """
+    Return the violations of a solution as "[HARD] ..." / "[SOFT] ..." messages.
+
+    Runs the same checks as evaluate_schedule with NumPy array operations and
+    formats only the genes that violate something. It is meant to be called
+    once per run, for the best individual.
+    """
+    genes = np.asarray(individual)
+    room_idx = genes[0].astype(np.intp)
+    ts_idx = genes[1].astype(np.intp)
+    n_ts = tables["n_timeslots"]
+
+    # HARD: Room existence and capacity
+    placed = tables["room_known"][room_idx]
+    overflow = np.where(placed, tables["students"] - tables["room_capacity"][room_idx], 0)
+    too_small = overflow > 0
+
+    # HARD: Room conflicts
+    placed_idx = np.flatnonzero(placed)
+    room_keys = room_idx[placed_idx] * n_ts + ts_idx[placed_idx]
+    room_counts = np.bincount(room_keys, minlength=tables["n_rooms"] * n_ts)
+
+    # HARD: Teacher conflicts
+    taught_idx = placed_idx[tables["teacher"][placed_idx] >= 0]
+    teacher = tables["teacher"][taught_idx]
+    teacher_ts = ts_idx[taught_idx]
+    teacher_keys = teacher * n_ts + teacher_ts
+    teacher_counts = np.bincount(teacher_keys, minlength=tables["n_teachers"] * n_ts)
+
+    # HARD: Workload exceeded
+    teacher_load = np.bincount(teacher, minlength=tables["n_teachers"])
+    excess = teacher_load - tables["max_load"]
 
-    assigned_room_timeslot = defaultdict(list)
-    teacher_load = defaultdict(int)
-    teacher_schedule = defaultdict(list)
+    # HARD: Teacher availability for the timeslot's shift
+    unavailable = tables["unavailable"][teacher, teacher_ts]
 
-    for idx, gene in enumerate(individual):
-        room, timeslot = gene
-        lesson_id = lesson_instances[idx]
-        class_id, subject, *_ = lesson_id.split("::")
-        students = class_students[class_id]
+    # SOFT: Preferred periods and favorite subjects
+    pref_miss = ~tables["pref_ok"][teacher, teacher_ts]
+    fav_miss = tables["fav_miss"][taught_idx]
 
-        # HARD: Room existence
-        if room not in rooms_capacity:
-            violations += 10
+    rooms = tables["rooms"]
+    timeslots = tables["timeslots"]
+    class_ids = tables["class_ids"]
+    subjects = tables["subjects"]
+    teacher_names = tables["teacher_names"]
+    reasons = []
+
+    soft_pref = np.zeros(genes.shape[1], dtype=bool)
+    soft_pref[taught_idx[pref_miss]] = True
+    soft_fav = np.zeros(genes.shape[1], dtype=bool)
+    soft_fav[taught_idx[fav_miss]] = True
+    for idx in np.flatnonzero(~placed | too_small | soft_pref | soft_fav):
+        room = rooms[room_idx[idx]]
+        timeslot = timeslots[ts_idx[idx]]
+        class_id = class_ids[idx]
+        subject = subjects[idx]
+        if not placed[idx]:
             reasons.append(f"[HARD] Room {room} not found in dataset.")
             continue
-
-        # HARD: Room capacity
-        if rooms_capacity[room] < students:
-            diff = students - rooms_capacity[room]
-            violations += diff * 2
+        if too_small[idx]:
             reasons.append(
-                f"[HARD] Room {room} (capacity {rooms_capacity[room]}) "
-                f"is too small for class {class_id} ({students} students)."
+                f"[HARD] Room {room} (capacity {tables['rooms_capacity'][room]}) "
+                f"is too small for class {class_id} ({tables['class_students'][class_id]} students)."
             )
-
-        assigned_room_timeslot[(room, timeslot)].append((idx, class_id))
-
-        # Teacher assignment
-        teacher_id = teacher_of_lesson.get(idx, None)
-        if teacher_id:
-            teacher_load[teacher_id] += 1
-            teacher_schedule[teacher_id].append((timeslot, class_id))
-            tinfo = teacher_info.get(teacher_id, {})
-
-            # SOFT: Preferred periods
-            preferred_periods_str = tinfo.get("teacher_preferred_periods", "")
-            preferred_periods = [p.strip() for p in preferred_periods_str.split(",") if p.strip()]
-            if preferred_periods and timeslot not in preferred_periods:
-                violations += 0.5
+        if soft_pref[idx] or soft_fav[idx]:
+            t = tables["teacher"][idx]
+            if soft_pref[idx]:
+                preferred_periods = tables["preferred_periods"][t]
                 reasons.append(
-                    f"[SOFT] {tinfo.get('teacher_name', teacher_id)} prefers {preferred_periods} "
+                    f"[SOFT] {teacher_names[t]} prefers {preferred_periods} "
                     f"but was assigned to {timeslot}."
                 )
-
-            # SOFT: Favorite subjects
-            fav_subjects_str = tinfo.get("teacher_favorites_subject", "")
-            fav_subjects = [s.strip() for s in fav_subjects_str.split(",") if s.strip()]
-            if fav_subjects and subject not in fav_subjects:
-                violations += 0.5
+            if soft_fav[idx]:
+                fav_subjects = tables["fav_subjects"][t]
                 reasons.append(
-                    f"[SOFT] {tinfo.get('teacher_name', teacher_id)} prefers {fav_subjects} "
+                    f"[SOFT] {teacher_names[t]} prefers {fav_subjects} "
                     f"but was assigned {subject}."
                 )
 
-    # HARD: Room conflicts
-    for (room, timeslot), group in assigned_room_timeslot.items():
-        if len(group) > 1:
-            involved = ", ".join([c for _, c in group])
-            violations += 10 * (len(group) - 1)
-            reasons.append(f"[HARD] Room conflict: {room} used by {involved} at {timeslot}.")
+    # Conflict groups are only needed to name the classes involved
+    room_groups = defaultdict(list)
+    for pos in np.flatnonzero(room_counts[room_keys] > 1):
+        idx = placed_idx[pos]
+        room_groups[(room_idx[idx], ts_idx[idx])].append(class_ids[idx])
+    for (room, timeslot), classes in room_groups.items():
+        reasons.append(
+            f"[HARD] Room conflict: {rooms[room]} used by {', '.join(classes)} "
+            f"at {timeslots[timeslot]}."
+        )
 
-    # HARD: Teacher conflicts
-    for tid, schedule in teacher_schedule.items():
-        timeslot_count = defaultdict(list)
-        for timeslot, class_id in schedule:
-            timeslot_count[timeslot].append(class_id)
-        for timeslot, classes in timeslot_count.items():
-            if len(classes) > 1:
-                violations += 10 * (len(classes) - 1)
-                reasons.append(
-                    f"[HARD] Teacher {teacher_info.get(tid, {}).get('teacher_name', tid)} "
-                    f"assigned to multiple classes ({', '.join(classes)}) in {timeslot}."
-                )
+    teacher_groups = defaultdict(list)
+    for pos in np.flatnonzero(teacher_counts[teacher_keys] > 1):
+        idx = taught_idx[pos]
+        teacher_groups[(teacher[pos], teacher_ts[pos])].append(class_ids[idx])
+    for (t, timeslot), classes in teacher_groups.items():
+        reasons.append(
+            f"[HARD] Teacher {teacher_names[t]} "
+            f"assigned to multiple classes ({', '.join(classes)}) in {timeslots[timeslot]}."
+        )
 
-    # HARD: Workload exceeded
-    for tid, load in teacher_load.items():
-        maxw = teacher_info.get(tid, {}).get("teacher_max_workload", None)
-        if maxw is not None and load > maxw:
-            diff = load - maxw
-            violations += diff * 2
-            reasons.append(
-                f"[HARD] Teacher {teacher_info.get(tid, {}).get('teacher_name', tid)} "
-                f"exceeded workload ({load} > {maxw})."
-            )
+    for t in np.flatnonzero(excess > 0):
+        reasons.append(
+            f"[HARD] Teacher {teacher_names[t]} "
+            f"exceeded workload ({teacher_load[t]} > {tables['max_load'][t]:g})."
+        )
+
+    for pos in np.flatnonzero(unavailable):
+        idx = taught_idx[pos]
+        reasons.append(
+            f"[HARD] Teacher {teacher_names[teacher[pos]]} "
+            f"is not available at {timeslots[ts_idx[idx]]} (class {class_ids[idx]})."
+        )
 
-    individual.reasons = reasons
-    return (violations,)
+    return reasons
 
 
 # ===========================================================
-# STEP 3: MUTATION AND CROSSOVER
+# STEP 3: MUTATION, CROSSOVER AND SELECTION
 # ===========================================================
-def mutate_individual(individual, rooms, timeslots, indpb=INDPB):
-    """Mutate an individual by altering room or timeslot with probability indpb."""
-    for i in range(len(individual)):
-        if random.random() < indpb:
-            if random.random() < 0.6:
-                individual[i] = (individual[i][0], random.choice(timeslots))
-            else:
-                individual[i] = (random.choice(rooms), individual[i][1])
+def mutate_individual(individual, tables, rng, indpb=INDPB, constrained=True):
+    """
+    Mutate an individual by altering room or timeslot index with probability indpb.
+
+    All random decisions are drawn in bulk and applied through boolean masks:
+    a mutated gene gets a new timeslot with probability 0.6, otherwise a new room
+    (drawn by sample_rooms).
+    """
+    mutate_draw, target_draw = rng.random((2, individual.shape[1]))
+    mutated = mutate_draw < indpb
+    change_timeslot = target_draw < 0.6
+
+    new_timeslot = mutated & change_timeslot
+    new_room = mutated & ~change_timeslot
+    individual[1, new_timeslot] = rng.integers(0, tables["n_timeslots"],
+                                               size=np.count_nonzero(new_timeslot))
+    individual[0, new_room] = sample_rooms(tables, np.flatnonzero(new_room), rng, constrained)
     return (individual,)
 
 
-def crossover_individual(ind1, ind2):
-    """Apply two-point crossover between individuals."""
-    if len(ind1) < 2:
+def _repair_core(room_row, ts_row, students, room_known, room_capacity, teacher, unavailable,
+                 rooms_by_capacity, feasible_start, n_rooms, n_ts):
+    """Greedy single pass over the genes of one genome, editing the rows in place."""
+    n_teachers = unavailable.shape[0]
+    room_count = np.zeros(n_rooms * n_ts, dtype=np.int32)
+    teacher_count = np.zeros(n_teachers * n_ts, dtype=np.int32)
+    for i in range(room_row.shape[0]):
+        room_count[int(room_row[i]) * n_ts + int(ts_row[i])] += 1
+        if teacher[i] >= 0:
+            teacher_count[int(teacher[i]) * n_ts + int(ts_row[i])] += 1
+
+    for i in range(room_row.shape[0]):
+        room = int(room_row[i])
+        ts = int(ts_row[i])
+        # Room missing, too small or shared: take the smallest free room that fits
+        if (not room_known[room] or students[i] > room_capacity[room]
+                or room_count[room * n_ts + ts] > 1):
+            for pos in range(feasible_start[i], rooms_by_capacity.shape[0]):
+                candidate = int(rooms_by_capacity[pos])
+                if room_count[candidate * n_ts + ts] == 0:
+                    room_count[room * n_ts + ts] -= 1
+                    room_count[candidate * n_ts + ts] += 1
+                    room_row[i] = candidate
+                    room = candidate
+                    break
+
+        # Teacher double-booked: take the first slot free for both teacher and room
+        t = int(teacher[i])
+        if t >= 0 and teacher_count[t * n_ts + ts] > 1:
+            for candidate in range(n_ts):
+                if (teacher_count[t * n_ts + candidate] == 0 and not unavailable[t, candidate]
+                        and room_count[room * n_ts + candidate] == 0):
+                    teacher_count[t * n_ts + ts] -= 1
+                    teacher_count[t * n_ts + candidate] += 1
+                    room_count[room * n_ts + ts] -= 1
+                    room_count[room * n_ts + candidate] += 1
+                    ts_row[i] = candidate
+                    break
+
+
+if HAS_NUMBA:
+    _repair_core = njit(cache=True)(_repair_core)
+
+
+def repair_individual(individual, tables):
+    """
+    Move lessons out of clearly infeasible placements, in place.
+
+    A lesson in a missing, too small or already used room is moved to the
+    smallest free room that fits at the same timeslot; a lesson whose teacher
+    is already busy is moved to the first timeslot where the teacher is free
+    and available and the room is empty. Lessons with no such option stay.
+    """
+    _repair_core(individual[0], individual[1], tables["students"], tables["room_known"],
+                 tables["room_capacity"], tables["teacher"], tables["unavailable"],
+                 tables["rooms_by_capacity"], tables["feasible_start"],
+                 tables["n_rooms"], tables["n_timeslots"])
+    return individual
+
+
+def repaired(tables):
+    """Toolbox decorator that runs repair_individual on every individual an operator returns."""
+    def decorator(operator):
+        @wraps(operator)
+        def wrapper(*args, **kwargs):
+            offspring = operator(*args, **kwargs)
+            for ind in offspring:
+                repair_individual(ind, tables)
+            return offspring
+        return wrapper
+    return decorator
+
+
+def crossover_individual(ind1, ind2, rng):
+    """
+    Apply two-point crossover between individuals.
+
+    Cut points are drawn as in tools.cxTwoPoint, so they always differ and at
+    least one gene is exchanged. That operator itself is not used because its
+    slice swap goes wrong on NumPy views.
+    """
+    length = ind1.shape[1]
+    if length < 2:
         return ind1, ind2
-    a = random.randint(1, len(ind1) - 1)
-    b = random.randint(1, len(ind1) - 1)
-    if a > b:
+    a = rng.integers(1, length + 1)
+    b = rng.integers(1, length)
+    if b >= a:
+        b += 1
+    else:
         a, b = b, a
-    ind1[a:b], ind2[a:b] = ind2[a:b], ind1[a:b]
+    # Slices of arrays are views, so one segment is buffered for the swap
+    tmp = ind1[:, a:b].copy()
+    ind1[:, a:b] = ind2[:, a:b]
+    ind2[:, a:b] = tmp
     return ind1, ind2
 
 
+def select_tournament(individuals, k, rng, tournsize=3):
+    """
+    Tournament selection with all draws made at once.
+
+    Same rule as tools.selTournament: `k` tournaments of `tournsize`
+    individuals drawn with replacement, each won by the best weighted fitness.
+    """
+    wvalues = np.array([ind.fitness.wvalues[0] for ind in individuals])
+    entrants = rng.integers(0, len(individuals), size=(k, tournsize))
+    winners = entrants[np.arange(k), np.argmax(wvalues[entrants], axis=1)]
+    return [individuals[i] for i in winners]
+
+
 # ===========================================================
 # STEP 4: RUN GENETIC ALGORITHM
 # ===========================================================
+# Lesson tables of the current run, set once in each pool worker
+_WORKER_TABLES = None
+# Pool kept open between runs on the same problem (e.g. retries), with its key
+_POOL = None
+_POOL_KEY = None
+# Tables that define the problem, and so which pool workers can be reused
+_POOL_KEY_TABLES = ("students", "room_known", "room_capacity", "teacher", "max_load",
+                    "pref_ok", "fav_miss", "unavailable")
+
+
+def _init_worker(tables):
+    """Pool initializer: keep the tables so tasks only carry the genomes."""
+    global _WORKER_TABLES
+    _WORKER_TABLES = tables
+
+
+def _evaluate_in_worker(genomes, upper_bound=np.inf):
+    """Score a chunk of genomes against the tables set by _init_worker."""
+    return batch_evaluate(genomes, _WORKER_TABLES, upper_bound)
+
+
+def _tables_key(tables, n_workers):
+    """Fingerprint the lesson tables, so a pool is only reused for the same problem."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.array([n_workers, tables["n_rooms"], tables["n_timeslots"]]).tobytes())
+    for name in _POOL_KEY_TABLES:
+        digest.update(np.ascontiguousarray(tables[name]).tobytes())
+    return digest.hexdigest()
+
+
+def close_worker_pool():
+    """Shut down the pool kept by get_worker_pool, if any."""
+    global _POOL, _POOL_KEY
+    if _POOL is not None:
+        _POOL.close()
+        _POOL.join()
+    _POOL = None
+    _POOL_KEY = None
+
+
+def get_worker_pool(tables, n_workers):
+    """
+    Return a pool of `n_workers` processes holding `tables`.
+
+    The pool stays open after the run, so later runs on the same problem
+    (such as retries) reuse its workers; a different problem or worker
+    count replaces it. It is closed at interpreter exit.
+    """
+    global _POOL, _POOL_KEY
+    key = _tables_key(tables, n_workers)
+    if _POOL is None or _POOL_KEY != key:
+        close_worker_pool()
+        _POOL = multiprocessing.Pool(n_workers, initializer=_init_worker, initargs=(tables,))
+        _POOL_KEY = key
+    return _POOL
+
+
+atexit.register(close_worker_pool)
+
+
+def make_population_evaluator(evaluate_chunk, map_func=map, n_chunks=1, cache_bytes=0):
+    """
+    Build a function that returns the fitness tuples of a list of individuals.
+
+    The genomes are stacked into one array, split into `n_chunks` pieces and
+    each piece is scored by one `evaluate_chunk(genomes, upper_bound)` call
+    through `map_func` (e.g. batch_evaluate with bound tables, or
+    _evaluate_in_worker for a pool).
+
+    With `cache_bytes` > 0 fitness values are also kept in an LRU cache keyed
+    by the genes, whose keys take at most that many bytes in total, so
+    offspring identical to an earlier individual are not evaluated again.
+    Offspring rarely repeat (about 2% of lookups hit over an 80-generation
+    run) and hashing costs more than the kernel saves, so it is off by
+    default. Partial values above `upper_bound` are cached as well, which is
+    safe as long as the bound never increases.
+    """
+    cache = OrderedDict()
+    cached_bytes = 0
+
+    def score(genomes, upper_bound):
+        stacked = np.stack(genomes)
+        chunks = np.array_split(stacked, min(n_chunks, len(stacked)))
+        bounded = partial(evaluate_chunk, upper_bound=upper_bound)
+        return np.concatenate(list(map_func(bounded, chunks)))
+
+    def evaluate_population(individuals, upper_bound=np.inf):
+        nonlocal cached_bytes
+        genomes = [np.asarray(ind, dtype=GENE_DTYPE) for ind in individuals]
+        if not genomes:
+            return []
+        if not cache_bytes:
+            return [(float(value),) for value in score(genomes, upper_bound)]
+
+        keys = [genes.tobytes() for genes in genomes]
+        found = {}
+        missing = {}
+        for key, genes in zip(keys, genomes):
+            if key in cache:
+                cache.move_to_end(key)
+                found[key] = cache[key]
+            elif key not in missing:
+                missing[key] = genes
+
+        if missing:
+            values = score(list(missing.values()), upper_bound)
+            for key, value in zip(missing, values):
+                fit = (float(value),)
+                found[key] = fit
+                cache[key] = fit
+                cached_bytes += len(key)
+            while cached_bytes > cache_bytes:
+                old_key, _ = cache.popitem(last=False)
+                cached_bytes -= len(old_key)
+
+        return [found[key] for key in keys]
+
+    return evaluate_population
+
+
 def execute_genAlgorithm(rooms, timeslots, lesson_instances, rooms_capacity, class_students,
                          teacher_of_lesson, teacher_info, class_grade_map,
-                         ngen=80, npop=150):
-    """Run the genetic algorithm to allocate schedules."""
+                         ngen=80, npop=150, processes=None, schedule_meta=None,
+                         check_availability=False, seed=SEED,
+                         early_exit=False, unconstrained=False, repair=True,
+                         target_fitness=0.0, initial_pop=None, patience=None, report=True):
+    """
+    Run the genetic algorithm to allocate schedules.
+
+    The teacher shift-availability constraint is opt-in: only with
+    `check_availability=True` is `schedule_meta` (as built by
+    main.build_timeslots) used to look up each timeslot's shift, and a
+    lesson placed in a shift its teacher is unavailable for costs 10.
+    Otherwise the availability table stays empty, so neither the fitness nor
+    repair_individual take shifts into account.
+
+    Each generation's offspring are evaluated as one batch. With numba a
+    batch scores in about a millisecond, so by default it is evaluated in this
+    process; without numba the default is a process pool with one worker per
+    CPU. `processes=1` always evaluates in-process and `processes=n` (n > 1)
+    always uses an n-worker pool, which is kept open for later runs on the
+    same problem (see get_worker_pool). The workers only compute fitness; all
+    random draws happen in this process and are reproducible from `seed`.
+
+    With `early_exit=True` offspring that are clearly worse than the best
+    individual so far get a partial fitness (still worse than the best) instead
+    of a full evaluation. This is faster but coarsens the ranking among the
+    worse offspring, so it is off by default.
+
+    Rooms are normally drawn among those big enough for the class, both for
+    the initial population and in mutation; `unconstrained=True` draws them
+    uniformly instead, for comparison. With `repair=True` every mated or
+    mutated individual also goes through repair_individual.
+
+    The run stops before `ngen` generations once the best fitness reaches
+    `target_fitness` (0.0, i.e. no violations, by default); pass None to
+    always run every generation. With `patience` set, it also stops once the
+    best fitness has not improved for that many generations in a row.
+
+    `initial_pop` warm-starts the run: its genomes (e.g. the best individuals
+    of an earlier attempt) replace the first members of the random population.
+    With `report=False` the remaining violations are not printed, so a caller
+    making several attempts can report only the last one.
+    """
     if not hasattr(creator, "FitnessMin"):
         creator.create("FitnessMin", base.Fitness, weights=(-1.0,))
     if not hasattr(creator, "ScheduleInd"):
-        creator.create("ScheduleInd", list, fitness=creator.FitnessMin)
+        creator.create("ScheduleInd", np.ndarray, fitness=creator.FitnessMin)
+
+    tables = precompute_lesson_tables(rooms, timeslots, lesson_instances, rooms_capacity,
+                                      class_students, teacher_of_lesson, teacher_info,
+                                      schedule_meta if check_availability else None)
+
+    # Operators draw from their own generator; DEAP's selection and
+    # variation steps use the `random` module
+    random.seed(seed)
+    rng = np.random.default_rng(seed)
 
     toolbox = base.Toolbox()
     toolbox.register("individual", tools.initIterate, creator.ScheduleInd,
-                     lambda: create_individual(rooms, timeslots, len(lesson_instances)))
+                     lambda: create_individual(tables, rng, not unconstrained))
     toolbox.register("population", tools.initRepeat, list, toolbox.individual)
-    toolbox.register("mate", crossover_individual)
-    toolbox.register("mutate", mutate_individual, rooms=rooms, timeslots=timeslots, indpb=INDPB)
-    toolbox.register("select", tools.selTournament, tournsize=3)
-    toolbox.register("evaluate", evaluate_schedule,
-                     lesson_instances=lesson_instances,
-                     rooms_capacity=rooms_capacity,
-                     class_students=class_students,
-                     teacher_of_lesson=teacher_of_lesson,
-                     teacher_info=teacher_info,
-                     class_grade_map=class_grade_map)
+    toolbox.register("mate", crossover_individual, rng=rng)
+    toolbox.register("mutate", mutate_individual, tables=tables, rng=rng, indpb=INDPB,
+                     constrained=not unconstrained)
+    toolbox.register("select", select_tournament, rng=rng, tournsize=3)
+    if repair:
+        toolbox.decorate("mate", repaired(tables))
+        toolbox.decorate("mutate", repaired(tables))
+    toolbox.register("evaluate", evaluate_schedule, tables=tables)
 
     pop = toolbox.population(n=npop)
-    hof = tools.HallOfFame(1)
+    for i, genes in enumerate(list(initial_pop or [])[:npop]):
+        pop[i] = creator.ScheduleInd(np.array(genes, dtype=GENE_DTYPE))
+    hof = tools.HallOfFame(1, similar=np.array_equal)
     stats = tools.Statistics(lambda ind: ind.fitness.values[0])
     stats.register("min", min)
     stats.register("avg", lambda fits: sum(fits) / len(fits))
 
-    pop, logbook = algorithms.eaSimple(
-        pop, toolbox, cxpb=0.7, mutpb=0.2, ngen=ngen,
-        stats=stats, halloffame=hof, verbose=False
-    )
+    use_gpu = HAS_CUDA and npop * len(lesson_instances) >= CUDA_MIN_GENES
+    if use_gpu and not check_cuda_agreement(tables, np.stack(pop)):
+        print("WARNING: GPU fitness differs from the CPU result; evaluating on the CPU.")
+        use_gpu = False
+    if use_gpu:
+        # CUDA contexts do not survive a fork, so the GPU is driven from this process
+        evaluate_population = make_population_evaluator(partial(batch_evaluate, tables=tables))
+    else:
+        if processes is None:
+            processes = 1 if HAS_NUMBA else os.cpu_count()
+        if processes == 1:
+            evaluate_population = make_population_evaluator(partial(batch_evaluate, tables=tables))
+        else:
+            # Compile the kernel here first: cache=True stores it on disk, so the
+            # workers load it instead of compiling (under fork or spawn alike)
+            batch_evaluate(np.stack(pop[:1]), tables)
+            pool = get_worker_pool(tables, processes)
+            evaluate_population = make_population_evaluator(_evaluate_in_worker, pool.map, processes)
+    logbook = tools.Logbook()
+    logbook.header = ["gen", "nevals"] + stats.fields
+    best_so_far = np.inf
+    stalled = 0
+    generations = 0
+    # Same steps as algorithms.eaSimple, but each generation's offspring
+    # are scored together in one batch
+    for gen in range(ngen + 1):
+        if gen > 0:
+            offspring = toolbox.select(pop, len(pop))
+            pop[:] = algorithms.varAnd(offspring, toolbox, cxpb=0.7, mutpb=0.2)
+            generations = gen
+        invalid_ind = [ind for ind in pop if not ind.fitness.valid]
+        bound = hof[0].fitness.values[0] if early_exit and len(hof) else np.inf
+        for ind, fit in zip(invalid_ind, evaluate_population(invalid_ind, bound)):
+            ind.fitness.values = fit
+        hof.update(pop)
+        logbook.record(gen=gen, nevals=len(invalid_ind), **stats.compile(pop))
+        if target_fitness is not None and hof[0].fitness.values[0] <= target_fitness:
+            break
+        if hof[0].fitness.values[0] < best_so_far:
+            best_so_far, stalled = hof[0].fitness.values[0], 0
+        else:
+            stalled += 1
+            if patience is not None and stalled >= patience:
+                break
 
     best = hof[0]
     fitness_value = best.fitness.values[0]
-    reasons = getattr(best, "reasons", [])
-    mapping = {lesson: best[idx] for idx, lesson in enumerate(lesson_instances)}
+    # Reasons are only formatted once, for the best individual
+    reasons = explain_schedule(best, tables)
+    mapping = {lesson: (rooms[best[0, idx]], timeslots[best[1, idx]])
+               for idx, lesson in enumerate(lesson_instances)}
 
-    if fitness_value > 0 and ngen >= 50:
-        print("\nAlgorithm did not eliminate all violations after 50 generations.")
+    if report and fitness_value > 0:
+        print(f"\nAlgorithm did not eliminate all violations after {generations} generations.")
         print("Remaining top issues:\n")
         for reason in reasons[:30]:
             print(f" - {reason}")
@@ -227,11 +1000,13 @@ def analyze_solution(best, fitness, reasons, mapping, lesson_instances, df_class
             "teacher": teacher_name
         })
 
+    # First row of each class, indexed once instead of filtering per class
+    class_rows = df_classes.drop_duplicates("class_id").set_index("class_id", drop=False)
     for class_id, slots in schedule_by_class.items():
-        row = df_classes[df_classes["class_id"] == class_id]
-        if not row.empty:
-            class_name = row.iloc[0].get("class_name", class_id)
-            num_students = row.iloc[0].get("num_students", "N/A")
+        if class_id in class_rows.index:
+            row = class_rows.loc[class_id]
+            class_name = row.get("class_name", class_id)
+            num_students = row.get("num_students", "N/A")
         else:
             class_name = class_id
             num_students = "N/A"
@@ -1,4 +1,5 @@
 import os
+import hashlib
 import random
 import numpy as np
 import pandas as pd
@@ -6,6 +7,8 @@ from sklearn.linear_model import LinearRegression
 from sklearn.preprocessing import StandardScaler
 import joblib
 
+MODELS_FILE = "models_by_grade.pkl"
+
 
 def load_historical_data(file_path="data/historical_enrollment_data.csv"):
     """Load and prepare historical enrollment data."""
@@ -30,6 +33,11 @@ def load_historical_data(file_path="data/historical_enrollment_data.csv"):
     return df
 
 
+def _data_fingerprint(df):
+    """Hash the historical data so saved models can be matched to it."""
+    return hashlib.sha1(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()).hexdigest()
+
+
 def train_models_by_grade(df):
     """Train a linear regression model for each grade."""
     if df is None or df.empty:
@@ -54,13 +62,31 @@ def train_models_by_grade(df):
         scaler = StandardScaler()
         X_scaled = scaler.fit_transform(X)
         model = LinearRegression().fit(X_scaled, y)
-        models[grade] = {"model": model, "scaler": scaler}
+        # Fold the scaling into the coefficients so predicting is one dot product
+        # on raw features: coef . (x - mean) / scale + intercept == x . w + b
+        w = model.coef_ / scaler.scale_
+        b = model.intercept_ - np.dot(w, scaler.mean_)
+        models[grade] = {"model": model, "scaler": scaler, "w": w, "b": b}
 
-    joblib.dump(models, "models_by_grade.pkl")
+    joblib.dump({"fingerprint": _data_fingerprint(df), "models": models}, MODELS_FILE)
     print(f"{len(models)} models successfully trained.")
     return models
 
 
+def load_or_train_models(df):
+    """Reuse the saved models if they were trained on this same data, otherwise train them."""
+    if df is not None and not df.empty and os.path.exists(MODELS_FILE):
+        try:
+            cached = joblib.load(MODELS_FILE)
+        except Exception as e:
+            print(f"Could not load {MODELS_FILE}: {e}")
+            cached = None
+        if isinstance(cached, dict) and cached.get("fingerprint") == _data_fingerprint(df):
+            print(f"{len(cached['models'])} models loaded from {MODELS_FILE}.")
+            return cached["models"]
+    return train_models_by_grade(df)
+
+
 def predict_by_grade(models, future_year=2025, regional_gdp=70000,
                      unemployment_rate=7.0, education_investment=1300000):
     """Predict enrollments for each grade in a given future year."""
@@ -71,26 +97,26 @@ def predict_by_grade(models, future_year=2025, regional_gdp=70000,
     results = {}
     base_year = 2020
 
-    for grade, data in models.items():
-        model = data["model"]
-        scaler = data["scaler"]
-
-        normalized_year = future_year - base_year
-        estimated_students = 200
-        per_capita_investment = education_investment / estimated_students
-        economic_index = regional_gdp / (unemployment_rate + 1)
-
-        X_new = np.array([[
-            normalized_year,
-            regional_gdp,
-            unemployment_rate,
-            education_investment,
-            per_capita_investment,
-            economic_index
-        ]])
-
-        X_scaled = scaler.transform(X_new)
-        prediction = model.predict(X_scaled)[0]
+    normalized_year = future_year - base_year
+    estimated_students = 200
+    per_capita_investment = education_investment / estimated_students
+    economic_index = regional_gdp / (unemployment_rate + 1)
+
+    x_new = np.array([
+        normalized_year,
+        regional_gdp,
+        unemployment_rate,
+        education_investment,
+        per_capita_investment,
+        economic_index
+    ])
+
+    # Every grade sees the same features, so all predictions come from one product
+    grades = list(models)
+    W = np.stack([models[grade]["w"] for grade in grades])
+    B = np.array([models[grade]["b"] for grade in grades])
+    predictions = W @ x_new + B
+    for grade, prediction in zip(grades, predictions):
         results[grade] = max(0, int(prediction))
 
     print("\nPredicted enrollments per grade:")
@@ -110,7 +136,7 @@ def generate_classes_from_predictions(predictions):
         "Portuguese", "Mathematics", "History", "Geography",
         "Science", "English", "Arts", "Physical Education"
     ]
-    rows = []
+    class_ids, class_names, levels, sizes, lessons = [], [], [], [], []
     class_counter = 1
 
     for grade, total_students in predictions.items():
@@ -125,23 +151,27 @@ def generate_classes_from_predictions(predictions):
             else:
                 class_name = f"{grade} {chr(section_letter)}"
 
-            class_id = f"C{class_counter:03d}"
-
-            for subject in subjects:
-                lessons_per_week = random.randint(2, 5)
-                rows.append({
-                    "class_id": class_id,
-                    "class_name": class_name,
-                    "education_level": grade,
-                    "num_students": num_students,
-                    "subject": subject,
-                    "lessons_per_week": lessons_per_week
-                })
+            class_ids.append(f"C{class_counter:03d}")
+            class_names.append(class_name)
+            levels.append(grade)
+            sizes.append(num_students)
+            lessons.extend(random.randint(2, 5) for _ in subjects)
 
             remaining -= num_students
             section_letter += 1
             class_counter += 1
 
+    # One row per (class, subject), built column-wise
+    n_subjects = len(subjects)
+    rows = {
+        "class_id": np.repeat(class_ids, n_subjects),
+        "class_name": np.repeat(class_names, n_subjects),
+        "education_level": np.repeat(levels, n_subjects),
+        "num_students": np.repeat(np.array(sizes, dtype=np.int64), n_subjects),
+        "subject": np.tile(subjects, len(class_ids)),
+        "lessons_per_week": np.array(lessons, dtype=np.int64)
+    }
+
     os.makedirs("data", exist_ok=True)
     df_classes = pd.DataFrame(rows)
     df_classes.to_csv("data/classes_data.csv", index=False)
@@ -151,7 +181,7 @@ def generate_classes_from_predictions(predictions):
 def main():
     """Execute the full regression and prediction pipeline."""
     df_hist = load_historical_data("data/historical_enrollment_data.csv")
-    models = train_models_by_grade(df_hist)
+    models = load_or_train_models(df_hist)
     predictions = predict_by_grade(models)
     generate_classes_from_predictions(predictions)
 
@@ -1,16 +1,56 @@
 import os
+import numpy as np
 import pandas as pd
 import random
-from genetic_algorithm import execute_genAlgorithm, analyze_solution
+import sys
+from functools import lru_cache
+from genetic_algorithm import (
+    HAS_CUDA, SEED, analyze_solution, check_cuda_agreement, execute_genAlgorithm,
+    precompute_lesson_tables
+)
 from linear_regression import (
     load_historical_data,
-    train_models_by_grade,
+    load_or_train_models,
     predict_by_grade,
     generate_classes_from_predictions
 )
 
+try:
+    import pyarrow  # noqa: F401
+    CSV_ENGINE = "pyarrow"
+except ImportError:
+    CSV_ENGINE = "c"
+
 random.seed(42)
 
+# Columns the scheduler reads from teachers_data.csv, with their parsed types
+TEACHER_DTYPES = {
+    "teacher_id": "string",
+    "name": "string",
+    "available_morning": "bool",
+    "available_afternoon": "bool",
+    "available_evening": "bool",
+    "max_workload": "int32",
+    "main_subject": "category",
+}
+# Values used when an optional teacher column is missing from the file
+TEACHER_DEFAULTS = {
+    "name": None,
+    "available_morning": True,
+    "available_afternoon": True,
+    "available_evening": False,
+    "max_workload": 40,
+    "main_subject": "General",
+}
+
+# GA runs made while violations remain; each one has 1.5x the generations, up to MAX_NGEN.
+# A single run by default: on over-constrained data every retry would still end above zero
+GA_ATTEMPTS = 1
+MAX_NGEN = 500
+# Generations without improvement after which an attempt stops early and leaves
+# the rest of the budget to the next one; None runs every generation
+GA_PATIENCE = None
+
 
 def ensure_data_directory():
     """Ensure that the 'data' directory exists."""
@@ -19,6 +59,28 @@ def ensure_data_directory():
         print("Directory 'data' was created automatically.")
 
 
+def _read_csv(path, dtypes=None):
+    if dtypes is None:
+        return pd.read_csv(path, engine=CSV_ENGINE)
+    # Only parse the known columns that the file actually has
+    header = pd.read_csv(path, nrows=0).columns
+    usecols = [col for col in header if col in dtypes]
+    return pd.read_csv(path, engine=CSV_ENGINE, usecols=usecols,
+                       dtype={col: dtypes[col] for col in usecols})
+
+
+@lru_cache(maxsize=1)
+def _load_inputs_cached(files):
+    """Parse the input CSVs; `files` holds (path, mtime) pairs so edited files are re-read."""
+    (classes_file, _), (rooms_file, _), (teachers_file, _), (schedules_file, _), (assign_file, _) = files
+    df_classes = _read_csv(classes_file)
+    df_rooms = _read_csv(rooms_file)
+    df_teachers = _read_csv(teachers_file, TEACHER_DTYPES)
+    df_schedules = _read_csv(schedules_file)
+    assign = _read_csv(assign_file) if assign_file else None
+    return df_classes, df_rooms, df_teachers, assign, df_schedules
+
+
 def load_inputs():
     """Load all required CSV files for the genetic algorithm."""
     if not os.path.exists("data/classes_data.csv"):
@@ -27,8 +89,6 @@ def load_inputs():
             "Make sure it was generated by the linear regression module."
         )
 
-    df_classes = pd.read_csv("data/classes_data.csv")
-
     required_files = [
         "data/rooms_data.csv",
         "data/teachers_data.csv",
@@ -38,80 +98,93 @@ def load_inputs():
         if not os.path.exists(file):
             raise FileNotFoundError(f"Required file missing: {file}")
 
-    df_rooms = pd.read_csv("data/rooms_data.csv")
-    df_teachers = pd.read_csv("data/teachers_data.csv")
-    df_schedules = pd.read_csv("data/schedules_data.csv")
-
-    df_assign = (
-        pd.read_csv("data/teacher_assignments.csv")
-        if os.path.exists("data/teacher_assignments.csv")
-        else None
-    )
+    paths = ["data/classes_data.csv"] + required_files
+    assign_file = "data/teacher_assignments.csv"
+    paths.append(assign_file if os.path.exists(assign_file) else None)
 
-    return df_classes, df_rooms, df_teachers, df_assign, df_schedules
+    # Repeated calls in the same process reuse the parsed frames until a file changes
+    files = tuple((path, os.path.getmtime(path) if path else None) for path in paths)
+    return _load_inputs_cached(files)
 
 
 def expand_lessons(df_classes):
     """Expand each class based on the number of weekly lessons."""
-    lesson_instances = []
-    for _, row in df_classes.iterrows():
-        class_id = row["class_id"]
-        subject = row.get("subject", "General")
-        lessons = int(row.get("lessons_per_week", 1))
-        for i in range(lessons):
-            lesson_instances.append(f"{class_id}::{subject}::{i + 1}")
-    return lesson_instances
+    if "lessons_per_week" in df_classes.columns:
+        counts = df_classes["lessons_per_week"].to_numpy(dtype=np.int64)
+    else:
+        counts = np.ones(len(df_classes), dtype=np.int64)
+
+    # Row of each lesson, and its number (1..n) within that row
+    rows = np.repeat(np.arange(len(df_classes)), counts)
+    numbers = np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts, counts) + 1
+
+    # Object -> str conversion formats values like str(), NaN included
+    class_ids = df_classes["class_id"].to_numpy(dtype=object).astype(str)
+    if "subject" in df_classes.columns:
+        subjects = df_classes["subject"].to_numpy(dtype=object).astype(str)
+    else:
+        subjects = np.full(len(df_classes), "General")
+
+    lesson_ids = pd.Series(class_ids[rows]).str.cat(
+        [pd.Series(subjects[rows]), pd.Series(numbers.astype(str))], sep="::"
+    )
+    return lesson_ids.tolist()
 
 
 def build_timeslots(df_schedules):
     """Create a list of available timeslots and their metadata."""
     timeslots = df_schedules["schedule_id"].tolist()
-    schedule_meta = {}
-    for _, r in df_schedules.iterrows():
-        tid = r["schedule_id"]
-        shift = r.get("shift", "")
-        label = f"{shift[0] if shift else ''}{r.get('period', '')}".replace(" ", "")
-        schedule_meta[tid] = {
-            "weekday": r.get("weekday", ""),
-            "shift": shift,
-            "period": r.get("period", ""),
-            "label": label
-        }
+
+    def column(name):
+        if name in df_schedules.columns:
+            return df_schedules[name].to_numpy(dtype=object)
+        return np.full(len(df_schedules), "", dtype=object)
+
+    meta = pd.DataFrame(
+        {"weekday": column("weekday"), "shift": column("shift"), "period": column("period")},
+        index=df_schedules["schedule_id"].to_numpy(dtype=object)
+    )
+    # Label: first letter of the shift followed by the period, without spaces
+    shift_initial = meta["shift"].fillna("").astype(str).str[:1]
+    meta["label"] = (shift_initial + meta["period"].to_numpy(dtype=object).astype(str)).str.replace(
+        " ", "", regex=False
+    )
+    # A repeated schedule_id keeps the metadata of its last row
+    meta = meta[~meta.index.duplicated(keep="last")]
+    schedule_meta = meta.to_dict("index")
     return timeslots, schedule_meta
 
 
 def build_rooms_capacity(df_rooms):
     """Create a dictionary mapping each room to its capacity."""
-    return dict(zip(df_rooms["room_id"], df_rooms["capacity"]))
+    return df_rooms.set_index("room_id")["capacity"].astype("int64").to_dict()
 
 
 def build_class_students(df_classes):
     """Return a dictionary with the number of students per class."""
-    class_students = {}
-    for _, row in df_classes.iterrows():
-        cid = row["class_id"]
-        class_students[cid] = int(row["num_students"])
-    return class_students
+    # Classes repeat once per subject; the last row of each class wins, as before
+    return (
+        df_classes.drop_duplicates("class_id", keep="last")
+        .set_index("class_id")["num_students"]
+        .astype("int64")
+        .to_dict()
+    )
 
 
-def build_teacher_assignment_map(lesson_instances, df_assignments, df_teachers):
+def build_teacher_assignment_map(lesson_instances, df_assignments, df_teachers, seed=42):
     """Assign teachers to lessons (randomly if no mapping is provided)."""
-    teacher_of_lesson = {}
-    teachers_info = {}
-
-    for _, r in df_teachers.iterrows():
-        teachers_info[r["teacher_id"]] = {
-            "name": r.get("name"),
-            "available_morning": bool(r.get("available_morning", True)),
-            "available_afternoon": bool(r.get("available_afternoon", True)),
-            "available_evening": bool(r.get("available_evening", False)),
-            "max_workload": int(r.get("max_workload", 40)),
-            "main_subject": r.get("main_subject", "General")
-        }
+    missing = {col: value for col, value in TEACHER_DEFAULTS.items() if col not in df_teachers.columns}
+    teachers_info = (
+        df_teachers.assign(**missing)
+        .drop_duplicates("teacher_id", keep="last")
+        .set_index("teacher_id")[list(TEACHER_DEFAULTS)]
+        .to_dict("index")
+    )
 
     teacher_ids = list(teachers_info.keys())
-    for idx, lesson in enumerate(lesson_instances):
-        teacher_of_lesson[idx] = random.choice(teacher_ids)
+    # One draw for every lesson instead of a random.choice call per lesson
+    picks = np.random.default_rng(seed).integers(0, len(teacher_ids), size=len(lesson_instances))
+    teacher_of_lesson = {idx: teacher_ids[pick] for idx, pick in enumerate(picks)}
 
     return teacher_of_lesson, teachers_info
 
@@ -151,8 +224,8 @@ def main():
                 return
 
             print(f"Historical data loaded: {len(df_hist)} records")
-            models = train_models_by_grade(df_hist)
-            print(f"Models trained for {len(models)} grades")
+            models = load_or_train_models(df_hist)
+            print(f"Models ready for {len(models)} grades")
 
             predictions = predict_by_grade(models)
             print(f"Predictions generated for {len(predictions)} grades")
@@ -178,8 +251,8 @@ def main():
             return
 
         print(f"Historical data loaded: {len(df_hist)} records")
-        models = train_models_by_grade(df_hist)
-        print(f"Models trained for {len(models)} grades")
+        models = load_or_train_models(df_hist)
+        print(f"Models ready for {len(models)} grades")
 
         predictions = predict_by_grade(models)
         print(f"Predictions generated for {len(predictions)} grades")
@@ -229,20 +302,34 @@ def main():
     teacher_of_lesson, teacher_info = build_teacher_assignment_map(
         lesson_instances, df_assign, df_teachers
     )
-
-    print("Running genetic algorithm...")
-    best, fitness, reasons, mapping = execute_genAlgorithm(
-        rooms=rooms,
-        timeslots=timeslots,
-        lesson_instances=lesson_instances,
-        rooms_capacity=rooms_capacity,
-        class_students=class_students,
-        teacher_of_lesson=teacher_of_lesson,
-        teacher_info=teacher_info,
-        class_grade_map={},
-        ngen=80,
-        npop=150
-    )
+    # Lessons are numbered in order, so the teachers line up with lesson_instances
+    teacher_by_lesson = dict(zip(lesson_instances, teacher_of_lesson.values()))
+
+    # Each retry starts from the best schedule of the previous attempt, with its
+    # own seed so it explores new ground instead of replaying the same draws
+    ngen = 80
+    best = None
+    for attempt in range(1, GA_ATTEMPTS + 1):
+        print(f"Running genetic algorithm (attempt {attempt}, ngen={ngen})...")
+        best, fitness, reasons, mapping = execute_genAlgorithm(
+            rooms=rooms,
+            timeslots=timeslots,
+            lesson_instances=lesson_instances,
+            rooms_capacity=rooms_capacity,
+            class_students=class_students,
+            teacher_of_lesson=teacher_of_lesson,
+            teacher_info=teacher_info,
+            class_grade_map={},
+            ngen=ngen,
+            npop=150,
+            seed=SEED + attempt - 1,
+            patience=GA_PATIENCE,
+            initial_pop=None if best is None else [best],
+            report=attempt == GA_ATTEMPTS
+        )
+        if fitness == 0:
+            break
+        ngen = min(int(ngen * 1.5), MAX_NGEN)
 
     # ===========================================================
     # STEP 3: REPORT AND ANALYSIS
@@ -259,7 +346,7 @@ def main():
         lesson_instances,
         df_classes,
         rooms_capacity,
-        {lesson: teacher_of_lesson[idx] for idx, lesson in enumerate(lesson_instances)},
+        teacher_by_lesson,
         teacher_info,
         schedule_meta
     )
@@ -269,5 +356,30 @@ def main():
     print("=" * 70)
 
 
+def check_cuda():
+    """Score random schedules for the input files on the GPU and the CPU and compare."""
+    if not HAS_CUDA:
+        print("No CUDA device available.")
+        return
+    df_classes, df_rooms, df_teachers, df_assign, df_schedules = load_inputs()
+    lesson_instances = expand_lessons(df_classes)
+    timeslots, _ = build_timeslots(df_schedules)
+    teacher_of_lesson, teacher_info = build_teacher_assignment_map(
+        lesson_instances, df_assign, df_teachers
+    )
+    tables = precompute_lesson_tables(
+        df_rooms["room_id"].tolist(), timeslots, lesson_instances,
+        build_rooms_capacity(df_rooms), build_class_students(df_classes),
+        teacher_of_lesson, teacher_info
+    )
+    if check_cuda_agreement(tables):
+        print("GPU and CPU fitness match.")
+    else:
+        print("ERROR: GPU and CPU fitness differ.")
+
+
 if __name__ == "__main__":
-    main()
+    if "--check-cuda" in sys.argv[1:]:
+        check_cuda()
+    else:
+        main()
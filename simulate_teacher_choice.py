@@ -1,49 +1,55 @@
 import os
-import random
 import pandas as pd
 import numpy as np
-import torch
-import matplotlib.pyplot as plt
 
 
 def simulate_teacher_choice(
     classes_file: str = "data/classes_data.csv",
     teachers_file: str = "data/teachers_data.csv",
-    output_file: str = "data/teacher_assignments.csv"
+    output_file: str = "data/teacher_assignments.csv",
+    seed=42
 ):
     """Simulate the assignment of teachers to classes based on subject expertise."""
     try:
         df_classes = pd.read_csv(classes_file)
         df_teachers = pd.read_csv(teachers_file)
 
-        assignments = []
+        rng = np.random.default_rng(seed)
+        subjects = df_classes["subject"].to_numpy(dtype=object)
+        # Row positions of the teachers of each main subject, computed once
+        specialists_by_subject = df_teachers.groupby("main_subject", sort=False).indices
 
-        for _, class_row in df_classes.iterrows():
-            subject = class_row["subject"]
-            possible_teachers = df_teachers[df_teachers["main_subject"] == subject]
+        # Classes whose subject no teacher specializes in, decided once for all rows
+        has_specialist = df_classes["subject"].isin(list(specialists_by_subject)).to_numpy()
+        properly_assigned = np.where(has_specialist, "Y", "N").astype(object)
 
-            if possible_teachers.empty:
-                # fallback: no teacher specializes in this subject
-                teacher = df_teachers.sample(1).iloc[0]
-                properly_assigned = "N"
-            else:
-                teacher = possible_teachers.sample(1).iloc[0]
-                properly_assigned = "Y"
+        # fallback: any teacher, for subjects nobody specializes in
+        picks = rng.integers(0, len(df_teachers), size=len(df_classes))
+        # One draw per covered subject instead of a filtered sample per class
+        for subject in pd.unique(subjects[has_specialist]):
+            specialists = specialists_by_subject[subject]
+            selected = subjects == subject
+            picks[selected] = specialists[rng.integers(0, specialists.size, size=selected.sum())]
 
-            assignments.append({
-                "teacher_id": teacher["teacher_id"],
-                "teacher_name": teacher["name"],
-                "main_subject": teacher["main_subject"],
-                "class_id": class_row["class_id"],
-                "class_name": class_row["class_name"],
-                "grade": class_row.get("education_level", "N/A"),
-                "subject": subject,
-                "num_students": class_row["num_students"],
-                "lessons_per_week": class_row["lessons_per_week"],
-                "properly_assigned": properly_assigned
-            })
-
-        df_assignments = pd.DataFrame(assignments)
+        teachers = df_teachers.iloc[picks]
+        # Missing column or missing values both read as "N/A"
+        grades = (
+            df_classes.get("education_level", pd.Series("N/A", index=df_classes.index))
+            .fillna("N/A")
+            .to_numpy()
+        )
+        df_assignments = pd.DataFrame({
+            "teacher_id": teachers["teacher_id"].to_numpy(),
+            "teacher_name": teachers["name"].to_numpy(),
+            "main_subject": teachers["main_subject"].to_numpy(),
+            "class_id": df_classes["class_id"].to_numpy(),
+            "class_name": df_classes["class_name"].to_numpy(),
+            "grade": grades,
+            "subject": subjects,
+            "num_students": df_classes["num_students"].to_numpy(),
+            "lessons_per_week": df_classes["lessons_per_week"].to_numpy(),
+            "properly_assigned": properly_assigned
+        })
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
         df_assignments.to_csv(output_file, index=False, encoding="utf-8")
 
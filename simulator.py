@@ -1,15 +1,18 @@
+import numpy as np
 import pandas as pd
-import random
 import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
-random.seed(42)
+SEED = 42
 
 
 # -------------------------
 # 1) Generate Schedules
 # -------------------------
-def generate_schedules():
-    """Generate the base weekly schedule grid (Monday–Friday, morning shift)."""
+@lru_cache(maxsize=None)
+def _schedule_grid():
+    """Build the fixed weekly grid; it never changes, so it is built once."""
     weekdays = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
     base_times = [
         ("07:30-08:20", "M1"),
@@ -19,24 +22,26 @@ def generate_schedules():
         ("11:10-12:00", "M5"),
         ("12:00-12:40", "M6"),
     ]
-    rows = []
-    for day in weekdays:
-        for period, label in base_times:
-            schedule_id = f"{day}_{label}"
-            rows.append({
-                "schedule_id": schedule_id,
-                "weekday": day,
-                "shift": "Manhã",
-                "period": period,
-                "label": f"{label} {period}"
-            })
-    return pd.DataFrame(rows)
+    rows = (
+        (f"{day}_{label}", day, "Manhã", period, f"{label} {period}")
+        for day in weekdays
+        for period, label in base_times
+    )
+    return pd.DataFrame.from_records(
+        rows, columns=["schedule_id", "weekday", "shift", "period", "label"]
+    )
+
+
+def generate_schedules():
+    """Generate the base weekly schedule grid (Monday–Friday, morning shift)."""
+    # Callers get their own copy, so the cached grid cannot be modified
+    return _schedule_grid().copy()
 
 
 # -------------------------
 # 2) Generate Teachers
 # -------------------------
-def generate_teachers():
+def generate_teachers(rng=None):
     """Generate synthetic teacher profiles with subject specialties and workload."""
     teacher_names = [
         "Ana Souza", "Carlos Pereira", "Juliana Costa", "João Almeida",
@@ -44,56 +49,61 @@ def generate_teachers():
         "Rafael Oliveira", "Clara Mendes"
     ]
 
-    subjects = [
+    subjects = np.array([
         "Português", "Matemática", "História", "Geografia",
         "Ciências", "Inglês", "Artes", "Educação Física",
         "Literatura", "Física", "Química", "Biologia",
         "Sociologia", "Filosofia"
-    ]
-
-    all_periods = ["M1", "M2", "M3", "M4", "M5", "M6"]
-    rows = []
-
-    for tid, name in enumerate(teacher_names, start=1):
-        specialist_subject = random.choice(subjects)
-        favorite_subjects = random.sample(subjects, k=random.randint(1, 3))
-        preferred_periods = ", ".join(sorted(random.sample(all_periods, k=random.randint(2, 5))))
-        max_workload = random.randint(12, 20)
-
-        rows.append({
-            "teacher_id": f"T{tid:03d}",
-            "name": name,
-            "main_subject": specialist_subject,
-            "favorite_subjects": ", ".join(favorite_subjects),
-            "available_morning": bool(random.getrandbits(1)),
-            "available_afternoon": bool(random.getrandbits(1)),
-            "available_evening": bool(random.getrandbits(1)),
-            "max_workload": max_workload
-        })
-    return pd.DataFrame(rows)
+    ])
+
+    # Every attribute is drawn for all teachers at once
+    if rng is None:
+        rng = np.random.default_rng(SEED)
+    n = len(teacher_names)
+    specialist_subject = rng.choice(subjects, size=n)
+    # Argsort of uniform keys gives each teacher a random ordering of the subjects;
+    # its first k entries are a sample without replacement
+    subject_order = rng.random((n, len(subjects))).argsort(axis=1)
+    favorite_counts = rng.integers(1, 4, size=n)
+    available = rng.random((n, 3)) < 0.5
+    max_workload = rng.integers(12, 21, size=n)
+
+    return pd.DataFrame({
+        "teacher_id": [f"T{tid:03d}" for tid in range(1, n + 1)],
+        "name": teacher_names,
+        "main_subject": specialist_subject,
+        "favorite_subjects": [
+            ", ".join(subjects[order[:k]]) for order, k in zip(subject_order, favorite_counts)
+        ],
+        "available_morning": available[:, 0],
+        "available_afternoon": available[:, 1],
+        "available_evening": available[:, 2],
+        "max_workload": max_workload
+    })
 
 
 # -------------------------
 # 3) Generate Rooms
 # -------------------------
-def generate_rooms():
+def generate_rooms(rng=None):
     """Generate a list of available rooms with different capacities."""
-    rows = []
-    for i in range(1, 11):
-        rows.append({
-            "room_id": f"SALA_{i:02d}",
-            "capacity": random.randint(30, 40)
-        })
-    rows.append({"room_id": "LAB_CIENCIAS", "capacity": 35})
-    rows.append({"room_id": "LAB_INFORMATICA", "capacity": 30})
-    rows.append({"room_id": "AUDITORIO", "capacity": 80})
-    return pd.DataFrame(rows)
+    if rng is None:
+        rng = np.random.default_rng(SEED)
+    n_classrooms = 10
+    special_rooms = {"LAB_CIENCIAS": 35, "LAB_INFORMATICA": 30, "AUDITORIO": 80}
+    return pd.DataFrame({
+        "room_id": [f"SALA_{i:02d}" for i in range(1, n_classrooms + 1)] + list(special_rooms),
+        "capacity": np.concatenate([
+            rng.integers(30, 41, size=n_classrooms),
+            np.fromiter(special_rooms.values(), dtype=np.int64)
+        ])
+    })
 
 
 # -------------------------
 # 4) Generate Historical Enrollment Data
 # -------------------------
-def generate_historical_enrollment_data():
+def generate_historical_enrollment_data(rng=None):
     """Generate synthetic historical enrollment, transfer, and dropout data."""
     years = [2020, 2021, 2022, 2023, 2024]
     grades = [
@@ -101,59 +111,60 @@ def generate_historical_enrollment_data():
         "1ª Série EM", "2ª Série EM", "3ª Série EM"
     ]
     bimestres = ["B1", "B2", "B3", "B4"]
-    data = []
-
-    for year in years:
-        for grade in grades:
-            regional_gdp = random.uniform(50000, 90000)
-            unemployment_rate = random.uniform(5.0, 12.0)
-            education_investment = random.uniform(800000, 1500000)
-
-            # Base number of students per grade
-            base_students = {
-                "6º Ano": random.randint(200, 280),
-                "7º Ano": random.randint(190, 270),
-                "8º Ano": random.randint(180, 260),
-                "9º Ano": random.randint(170, 250),
-                "1ª Série EM": random.randint(160, 240),
-                "2ª Série EM": random.randint(150, 230),
-                "3ª Série EM": random.randint(140, 220),
-            }
-            total_enrollments = base_students[grade]
-
-            # Average rates (%)
-            transfer_in_rate = random.uniform(1.0, 6.0)
-            transfer_out_rate = random.uniform(1.0, 6.0)
-            dropout_rate = random.uniform(0.5, 4.0)
-
-            total_transfer_in = int(total_enrollments * transfer_in_rate / 100)
-            total_transfer_out = int(total_enrollments * transfer_out_rate / 100)
-            total_dropouts = int(total_enrollments * dropout_rate / 100)
-
-            # Bimonthly distribution (may include zeros)
-            transfers_in_bi = {b: random.randint(0, total_transfer_in // 4) for b in bimestres}
-            transfers_out_bi = {b: random.randint(0, total_transfer_out // 4) for b in bimestres}
-            dropouts_bi = {b: random.randint(0, total_dropouts // 4) for b in bimestres}
-
-            data.append({
-                "year": year,
-                "grade": grade,
-                "regional_gdp": regional_gdp,
-                "unemployment_rate": unemployment_rate,
-                "education_investment": education_investment,
-                "total_enrollments": total_enrollments,
-                "transfer_in_rate": round(transfer_in_rate, 2),
-                "transfer_out_rate": round(transfer_out_rate, 2),
-                "dropout_rate": round(dropout_rate, 2),
-                "total_transfer_in": total_transfer_in,
-                "total_transfer_out": total_transfer_out,
-                "total_dropouts": total_dropouts,
-                **{f"transfers_in_{b}": transfers_in_bi[b] for b in bimestres},
-                **{f"transfers_out_{b}": transfers_out_bi[b] for b in bimestres},
-                **{f"dropouts_{b}": dropouts_bi[b] for b in bimestres}
-            })
-
-    return pd.DataFrame(data)
+    # Base number of students per grade (inclusive ranges)
+    base_students = {
+        "6º Ano": (200, 280),
+        "7º Ano": (190, 270),
+        "8º Ano": (180, 260),
+        "9º Ano": (170, 250),
+        "1ª Série EM": (160, 240),
+        "2ª Série EM": (150, 230),
+        "3ª Série EM": (140, 220),
+    }
+
+    # One row per (year, grade); every column is drawn in a single call
+    if rng is None:
+        rng = np.random.default_rng(SEED)
+    n = len(years) * len(grades)
+    low, high = np.array([base_students[g] for g in grades]).T
+    total_enrollments = rng.integers(np.tile(low, len(years)), np.tile(high, len(years)) + 1)
+
+    regional_gdp = rng.uniform(50000, 90000, n)
+    unemployment_rate = rng.uniform(5.0, 12.0, n)
+    education_investment = rng.uniform(800000, 1500000, n)
+
+    # Average rates (%)
+    transfer_in_rate = rng.uniform(1.0, 6.0, n)
+    transfer_out_rate = rng.uniform(1.0, 6.0, n)
+    dropout_rate = rng.uniform(0.5, 4.0, n)
+
+    total_transfer_in = (total_enrollments * transfer_in_rate / 100).astype(np.int64)
+    total_transfer_out = (total_enrollments * transfer_out_rate / 100).astype(np.int64)
+    total_dropouts = (total_enrollments * dropout_rate / 100).astype(np.int64)
+
+    # Bimonthly distribution (may include zeros)
+    nb = len(bimestres)
+    transfers_in_bi = rng.integers(0, total_transfer_in[:, None] // 4 + 1, size=(n, nb))
+    transfers_out_bi = rng.integers(0, total_transfer_out[:, None] // 4 + 1, size=(n, nb))
+    dropouts_bi = rng.integers(0, total_dropouts[:, None] // 4 + 1, size=(n, nb))
+
+    return pd.DataFrame({
+        "year": np.repeat(years, len(grades)),
+        "grade": np.tile(grades, len(years)),
+        "regional_gdp": regional_gdp,
+        "unemployment_rate": unemployment_rate,
+        "education_investment": education_investment,
+        "total_enrollments": total_enrollments,
+        "transfer_in_rate": transfer_in_rate.round(2),
+        "transfer_out_rate": transfer_out_rate.round(2),
+        "dropout_rate": dropout_rate.round(2),
+        "total_transfer_in": total_transfer_in,
+        "total_transfer_out": total_transfer_out,
+        "total_dropouts": total_dropouts,
+        **{f"transfers_in_{b}": transfers_in_bi[:, k] for k, b in enumerate(bimestres)},
+        **{f"transfers_out_{b}": transfers_out_bi[:, k] for k, b in enumerate(bimestres)},
+        **{f"dropouts_{b}": dropouts_bi[:, k] for k, b in enumerate(bimestres)}
+    })
 
 
 # -------------------------
@@ -164,15 +175,25 @@ def main():
     output_dir = "data"
     os.makedirs(output_dir, exist_ok=True)
 
+    # One generator drives every dataset, so a run is reproducible from SEED
+    rng = np.random.default_rng(SEED)
     schedules = generate_schedules()
-    teachers = generate_teachers()
-    rooms = generate_rooms()
-    historical = generate_historical_enrollment_data()
-
-    schedules.to_csv(os.path.join(output_dir, "schedules_data.csv"), index=False)
-    teachers.to_csv(os.path.join(output_dir, "teachers_data.csv"), index=False)
-    rooms.to_csv(os.path.join(output_dir, "rooms_data.csv"), index=False)
-    historical.to_csv(os.path.join(output_dir, "historical_enrollment_data.csv"), index=False)
+    teachers = generate_teachers(rng)
+    rooms = generate_rooms(rng)
+    historical = generate_historical_enrollment_data(rng)
+
+    outputs = [
+        (schedules, "schedules_data.csv"),
+        (teachers, "teachers_data.csv"),
+        (rooms, "rooms_data.csv"),
+        (historical, "historical_enrollment_data.csv"),
+    ]
+    # The files are independent, so their writes can overlap
+    with ThreadPoolExecutor(max_workers=len(outputs)) as executor:
+        list(executor.map(
+            lambda item: item[0].to_csv(os.path.join(output_dir, item[1]), index=False),
+            outputs
+        ))
 
     return schedules, teachers, rooms, historical
 
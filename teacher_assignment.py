@@ -1,15 +1,42 @@
+import os
+import numpy as np
 import pandas as pd
 from genetic_algorithm import config_genAlgorithm, execute_genAlgorithm, analyze_problem_and_suggest
 
+try:
+    import pyarrow  # noqa: F401
+    CSV_ENGINE = "pyarrow"
+except ImportError:
+    CSV_ENGINE = "c"
+
+# Set GA_VERBOSE=1 to report every rejected attempt
+VERBOSE = os.getenv("GA_VERBOSE") == "1"
+
+def read_columns(filename, columns):
+    """
+    Read only the wanted columns of a CSV, ignoring stray spaces in the header.
+    `columns` maps each wanted name to its dtype (None lets pandas infer it);
+    wanted columns the file lacks are simply not returned.
+    """
+    header = pd.read_csv(filename, nrows=0).columns
+    usecols = [col for col in header if col.strip() in columns]
+    dtype = {col: columns[col.strip()] for col in usecols if columns[col.strip()] is not None}
+    df = pd.read_csv(filename, engine=CSV_ENGINE, usecols=usecols, dtype=dtype)
+    df.columns = df.columns.str.strip()
+    return df
+
+
 def load_teacher_assignments(filename='teacher_assignments.csv'):
     """
     Load teacher-class assignments from CSV.
-    Expected columns: teacher_id, teacher_name, class_id, class_name,
-    subject, num_students, lessons_per_week, assigned
+    Returns the rows marked assigned == 'Y', with only the columns used
+    here: teacher_id, class_id, num_students and assigned. Other columns in
+    the file (teacher_name, class_name, subject, ...) are not read.
     """
     try:
-        df = pd.read_csv(filename)
-        df.columns = df.columns.str.strip()
+        # Ids repeat on every row, so categorical codes make the filters/joins cheaper
+        df = read_columns(filename, {'teacher_id': 'category', 'class_id': 'category',
+                                     'num_students': 'int64', 'assigned': None})
 
         if 'assigned' in df.columns:
             df = df[df['assigned'].str.upper().str.strip() == 'Y']
@@ -35,16 +62,15 @@ def load_scheduling_data(df_assignments):
     """
     try:
         # Load rooms
-        df_rooms = pd.read_csv('rooms_data.csv')
-        df_rooms.columns = df_rooms.columns.str.strip()
+        df_rooms = read_columns('rooms_data.csv', {'room_id': str, 'capacity': 'int64'})
 
         # Load schedules
-        df_schedules = pd.read_csv('schedules_data.csv')
-        df_schedules.columns = df_schedules.columns.str.strip()
+        df_schedules = read_columns('schedules_data.csv', {'schedule_id': str})
 
         # Load teacher info
-        df_teachers = pd.read_csv('teachers_data.csv')
-        df_teachers.columns = df_teachers.columns.str.strip()
+        df_teachers = read_columns('teachers_data.csv', {'teacher_id': str,
+                                                         'available_timeslots': None,
+                                                         'preferred_timeslots': None})
 
         # Build classes list from assignments
         classes = df_assignments['class_id'].tolist()
@@ -60,10 +86,17 @@ def load_scheduling_data(df_assignments):
         schedules = df_schedules['schedule_id'].tolist()
 
         # Teachers with availability and preferences
+        teacher_rows = df_teachers.set_index('teacher_id').to_dict('index')
+        # observed=True skips categories left empty by the 'assigned' filter
+        classes_by_teacher = (
+            df_assignments.groupby('teacher_id', sort=False, observed=True)['class_id']
+            .apply(list)
+            .to_dict()
+        )
         teachers = {}
-        for teacher_id in df_assignments['teacher_id'].unique():
-            teacher_classes = df_assignments[df_assignments['teacher_id'] == teacher_id]['class_id'].tolist()
-            tinfo = df_teachers[df_teachers['teacher_id'] == teacher_id].iloc[0]
+        class_to_teacher = {}
+        for teacher_id, teacher_classes in classes_by_teacher.items():
+            tinfo = teacher_rows[teacher_id]
 
             # Parse slot lists from CSV (separated by ;)
             available_slots = []
@@ -78,6 +111,9 @@ def load_scheduling_data(df_assignments):
                 "available_timeslots": available_slots,
                 "preferred_timeslots": preferred_slots
             }
+            # Reverse index for the reports; the first teacher listed keeps the class
+            for class_id in teacher_classes:
+                class_to_teacher.setdefault(class_id, teacher_id)
 
         data = {
             "classes": classes,
@@ -85,7 +121,8 @@ def load_scheduling_data(df_assignments):
             "rooms": rooms,
             "rooms_capacity": rooms_capacity,
             "schedules": schedules,
-            "teachers": teachers
+            "teachers": teachers,
+            "class_to_teacher": class_to_teacher
         }
 
         print("\n✓ Scheduling data prepared successfully")
@@ -103,11 +140,11 @@ def load_scheduling_data(df_assignments):
 
 def check_viability(classes, class_students, classes_capacity):
     """Check if all classes can be accommodated in available rooms."""
-    inviable_classes = []
-    for group in classes:
-        students = class_students[group]
-        if not any(cap >= students for cap in classes_capacity.values()):
-            inviable_classes.append(group)
+    # A class is viable when it fits in the largest room
+    caps = np.fromiter(classes_capacity.values(), dtype=np.int64, count=len(classes_capacity))
+    max_cap = caps.max() if caps.size else -1
+    students = np.array([class_students[group] for group in classes], dtype=np.int64)
+    inviable_classes = [group for group, bad in zip(classes, students > max_cap) if bad]
     if inviable_classes:
         print("\n⚠️  The following classes are NOT viable:")
         for t in inviable_classes:
@@ -129,39 +166,40 @@ def show_teacher_schedule(solution, classes, teachers):
         group = classes[i]
         group_schedule[group] = schedule
 
-    print("\nTeacher Schedules:")
+    lines = ["\nTeacher Schedules:"]
     for teacher, data in teachers.items():
         if data["classes"]:
-            print(f"Teacher {teacher}:")
+            lines.append(f"Teacher {teacher}:")
             for group in data["classes"]:
                 schedule = group_schedule.get(group, None)
                 if schedule:
-                    print(f"  - Class {group}: Schedule {schedule}")
+                    lines.append(f"  - Class {group}: Schedule {schedule}")
                 else:
-                    print(f"  - Class {group}: Not allocated")
+                    lines.append(f"  - Class {group}: Not allocated")
+    print("\n".join(lines))
 
 
 def save_schedule_results(best_solution, data, filename='final_schedule.csv'):
     """Save the final schedule solution to CSV."""
-    schedule_data = []
+    class_ids, rooms, schedules = [], [], []
+    teacher_ids, num_students, room_capacity = [], [], []
 
     for group, room, schedule in best_solution:
-        teacher_id = None
-        for prof, prof_data in data["teachers"].items():
-            if group in prof_data["classes"]:
-                teacher_id = prof
-                break
-
-        schedule_data.append({
-            'class_id': group,
-            'room': room,
-            'schedule': schedule,
-            'teacher_id': teacher_id,
-            'num_students': data["class_students"][group],
-            'room_capacity': data["rooms_capacity"][room]
-        })
-
-    df_schedule = pd.DataFrame(schedule_data)
+        class_ids.append(group)
+        rooms.append(room)
+        schedules.append(schedule)
+        teacher_ids.append(data["class_to_teacher"].get(group))
+        num_students.append(data["class_students"][group])
+        room_capacity.append(data["rooms_capacity"][room])
+
+    df_schedule = pd.DataFrame({
+        'class_id': class_ids,
+        'room': rooms,
+        'schedule': schedules,
+        'teacher_id': teacher_ids,
+        'num_students': num_students,
+        'room_capacity': room_capacity
+    })
     df_schedule.to_csv(filename, index=False, encoding="utf-8")
     print(f"\n✓ Final schedule saved to: {filename}")
 
@@ -203,10 +241,13 @@ def main():
     tries = 0
     rejected_solutions = 0
     max_tries_before_suggestion = 100
+    progress_every = 10
 
     while not solution_found:
         tries += 1
-        print(f"\n Attempt #{tries} - Evolving population...")
+        if tries == 1 or tries % progress_every == 0:
+            print(f"\n Attempt #{tries} - Evolving population "
+                  f"({rejected_solutions} solutions rejected so far)...")
 
         hof, log = execute_genAlgorithm(toolbox, ngen=50, npop=100)
 
@@ -217,57 +258,62 @@ def main():
                 print("\nSearch interrupted by user.")
                 return
 
-        for ind in hof:
-            if ind.fitness.values[0] == 0.0:
-                actual_solution = [(room, schedule) for room, schedule in ind]
-
-                if check_distinct_class(actual_solution):
-                    solution_found = True
-                    best_result = [
-                        (data["classes"][i], room, schedule) for i, (room, schedule) in enumerate(actual_solution)
-                    ]
-                    fitness = ind.fitness.values
-
-                    print("\n" + "="*70)
-                    print("✓ OPTIMAL SCHEDULE FOUND!")
-                    print("="*70)
-
-                    print("\nSchedule Details:")
-                    for group, room, schedule in best_result:
-                        print(f"  Class {group} → Room {room} - Schedule {schedule}")
-
-                    print(f"\nFitness (violations, occupancy rate): ({fitness[0]}, {fitness[1]:.2f}%)")
-
-                    print("\nRoom occupancy:")
-                    students_per_room = {}
-                    for i, (room, _) in enumerate(actual_solution):
-                        group = data["classes"][i]
-                        students = data["class_students"][group]
-                        students_per_room[room] = students_per_room.get(room, 0) + students
-
-                    for room, students in students_per_room.items():
-                        capacity = data["rooms_capacity"].get(room, 0)
-                        occupancy = (students / capacity) * 100 if capacity > 0 else 0.0
-                        print(f"  Room {room}: {students} students / {capacity} capacity → {occupancy:.2f}%")
-
-                    # Show teacher schedules
-                    show_teacher_schedule(actual_solution, data["classes"], data["teachers"])
-
-                    # Save results
-                    save_schedule_results(best_result, data)
-
-                    if rejected_solutions > 0:
-                        print(f"\n Total rejected solutions: {rejected_solutions}")
-
-                    print("\n" + "="*70)
-                    print("✓ SCHEDULE OPTIMIZATION COMPLETE!")
-                    print("="*70)
-                    return
-                else:
-                    rejected_solutions += 1
-                    print(f"  ✗ Solution #{rejected_solutions} REJECTED: Duplicate room assignments")
-            else:
-                rejected_solutions += 1
+        # The hall of fame is sorted best first: if its head has violations, nothing in it is feasible
+        if not len(hof) or hof[0].fitness.values[0] != 0.0:
+            rejected_solutions += len(hof)
+            continue
+
+        # The first zero-fitness individual with distinct rooms ends the search
+        feasible = next(
+            (ind for ind in hof if ind.fitness.values[0] == 0.0 and check_distinct_class(list(ind))),
+            None
+        )
+        if feasible is None:
+            duplicates = sum(ind.fitness.values[0] == 0.0 for ind in hof)
+            if duplicates and VERBOSE:
+                print(f"  ✗ {duplicates} solution(s) REJECTED: Duplicate room assignments")
+            rejected_solutions += len(hof)
+            continue
+
+        solution_found = True
+        actual_solution = [(room, schedule) for room, schedule in feasible]
+        best_result = [
+            (data["classes"][i], room, schedule) for i, (room, schedule) in enumerate(actual_solution)
+        ]
+        fitness = feasible.fitness.values
+
+        # The report is collected and written in one go
+        lines = ["\n" + "="*70, "✓ OPTIMAL SCHEDULE FOUND!", "="*70, "\nSchedule Details:"]
+        lines.extend(
+            f"  Class {group} → Room {room} - Schedule {schedule}" for group, room, schedule in best_result
+        )
+        lines.append(f"\nFitness (violations, occupancy rate): ({fitness[0]}, {fitness[1]:.2f}%)")
+
+        lines.append("\nRoom occupancy:")
+        # Rooms coded in order of first use, students summed per code
+        room_codes, used_rooms = pd.factorize(pd.Series([room for room, _ in actual_solution], dtype=object))
+        students_arr = np.array([data["class_students"][group] for group, _, _ in best_result], dtype=np.int64)
+        students_per_room = np.bincount(room_codes, weights=students_arr, minlength=len(used_rooms))
+
+        for room, students in zip(used_rooms, students_per_room.astype(np.int64)):
+            capacity = data["rooms_capacity"].get(room, 0)
+            occupancy = (students / capacity) * 100 if capacity > 0 else 0.0
+            lines.append(f"  Room {room}: {students} students / {capacity} capacity → {occupancy:.2f}%")
+        print("\n".join(lines))
+
+        # Show teacher schedules
+        show_teacher_schedule(actual_solution, data["classes"], data["teachers"])
+
+        # Save results
+        save_schedule_results(best_result, data)
+
+        if rejected_solutions > 0:
+            print(f"\n Total rejected solutions: {rejected_solutions}")
+
+        print("\n" + "="*70)
+        print("✓ SCHEDULE OPTIMIZATION COMPLETE!")
+        print("="*70)
+        return
 
 
 if __name__ == "__main__":